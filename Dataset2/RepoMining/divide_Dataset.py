@@ -6,8 +6,7 @@ os.chdir("..")
 cwd = os.getcwd()
 csvfile = open('initial_Dataset.csv', 'r').readlines()
 filename = 1
-if "Dataset_Divided" not in os.listdir():
-	os.mkdir("Dataset_Divided")
+os.makedirs("Dataset_Divided", exist_ok=True)
 os.chdir(cwd +"/Dataset_Divided")
 for i in range(len(csvfile)):
 	if i % 50 == 0:
@@ -1,6 +1,10 @@
 import csv
 import requests
 import os
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from pydriller import RepositoryMining
 """"
 Execution of the repository mining from the initial_Dataset.csv with pyDriller.
@@ -21,8 +25,7 @@ def initialize(miniDatasetName):
     with open(name_dataset, mode='r') as csv_file:
             os.chdir("..")
             os.chdir("mining_results")
-            if repoName not in os.listdir():
-                os.mkdir(repoName)
+            os.makedirs(repoName, exist_ok=True)
             os.chdir(repoName)
             csv_reader = csv.DictReader(csv_file)
             first = 0
@@ -33,6 +36,51 @@ def initialize(miniDatasetName):
                 i+=1
             startMiningRepo(data, cwd, repoName)
             os.chdir(cwd)
+#shared session, so the liveness probes reuse the same TCP/TLS connection
+_session = requests.Session()
+
+#cache of the commits already traversed with pyDriller, key: (repo url, commit hash)
+_repo_cache = {}
+#local partial clones of the already seen repositories, key: repo url
+_clone_cache = {}
+
+'''
+@Param link: url of the repository (with .git).
+Clone the repository once in a temporary folder with a blobless partial clone,
+so git downloads the file contents on demand instead of the whole history.
+The next calls for the same repository reuse the local clone.
+It returns the local path of the clone, or the url itself if the clone fails.
+'''
+def getLocalRepo(link):
+    if link not in _clone_cache:
+        cartella = os.path.join(tempfile.mkdtemp(prefix="repo_mining_"), "repo")
+        esito = subprocess.run(["git", "clone", "--filter=blob:none", "--no-checkout", link, cartella],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _clone_cache[link] = cartella if esito.returncode == 0 else link
+    return _clone_cache[link]
+
+'''
+@Param link: url of the repository (with .git).
+@Param commit_id: hash of the commit.
+Traverse the commit with pyDriller only the first time it is requested;
+the following calls for the same repository and commit reuse the cached list.
+'''
+def getCommits(link, commit_id):
+    key = (link, commit_id)
+    if key not in _repo_cache:
+        _repo_cache[key] = list(RepositoryMining(getLocalRepo(link), single=commit_id, only_modifications_with_file_types=['.java']).traverse_commits())
+    return _repo_cache[key]
+
+'''
+@Param cartella: destination folder of the java file (<mining_results>/<repoName>/<cve_id>/<commit_id>)
+@Param fileName: name of the java file.
+@Param sourceCode: the before image of the java file.
+Create the destination folder if it doesn't exist and write the java file inside it.
+'''
+def writeJavaFile(cartella, fileName, sourceCode):
+    os.makedirs(cartella, exist_ok=True)
+    Path(cartella, fileName).write_text(sourceCode, encoding="utf-8")
+
 '''
 @Param data: the line that contains the commits.
 @Param cwd: the current directory.
@@ -46,9 +94,14 @@ def startMiningRepo(data, cwd, repoName):
     statusNE = "NOT EXIST COMMIT\n"
     statusNR = "REPO NOT AVAILABLE\n"
     statusVE = "VALUE ERROR! COMMIT HASH NOT EXISTS\n"
+    statusEM = "EMPTY URL OR COMMIT HASH\n"
     file1 = open("CHECK.txt", "a")
     file2 = open("ERRORS.txt","a")
-    j = 0    
+    #the writes of the java files are independent, overlap them on a pool of threads
+    writer = ThreadPoolExecutor(max_workers=16)
+    #keep the future of every queued write to check its outcome at the end
+    writes = []
+    j = 0
     for line in data:
         link=data[line]['repo_url']+'.git'
         #per chiamare la seconda api e controllare che il commit esiste
@@ -58,24 +111,35 @@ def startMiningRepo(data, cwd, repoName):
         print(link)
         status = ""
         toWrite = "indice: " + str(j+1) + " link repo: " + str(link1) + " status: "
-        response = requests.get(link)
-        if response:
-            response1 = requests.get(link1+"/commit/"+commit_id)
-            if response1:
+        #skip the lines of the dataset without a repository url or a commit hash
+        if not link1 or not commit_id:
+            status = statusEM
+            toWrite = toWrite + status
+            file1.write(toWrite)
+            j+=1
+            continue
+        #a timeout or a connection error counts as repo/commit not reachable, the run must go on
+        try:
+            response = _session.head(link, allow_redirects=True, timeout=5)
+            repo_ok = response.status_code < 400
+        except requests.RequestException:
+            repo_ok = False
+        if repo_ok:
+            try:
+                response1 = _session.head(link1+"/commit/"+commit_id, allow_redirects=True, timeout=5)
+                commit_ok = response1.status_code < 400
+            except requests.RequestException:
+                commit_ok = False
+            if commit_ok:
                 try:
-                    for commit in RepositoryMining(link, commit_id).traverse_commits():
+                    for commit in getCommits(link, commit_id):
                        for mod in commit.modifications:
-                          if ".java" in mod.filename:
-                             if cve_id not in os.listdir():
-                                 os.mkdir(cve_id)
-                             os.chdir(cve_id)
-                             if commit_id not in os.listdir():
-                                os.mkdir(commit_id)
-                             os.chdir(commit_id)
+                          #the pyDriller filter is commit level, a passing commit still carries its non java files
+                          if mod.filename.endswith(".java"):
                              if mod.source_code_before != None:
-                                javafile=open(mod.filename,"w+")
-                                javafile.write(mod.source_code_before)
-                             os.chdir(cwd+"/"+repoName)
+                                cartella = os.path.join(cwd, "mining_results", repoName, cve_id, commit_id)
+                                esito = writer.submit(writeJavaFile, cartella, mod.filename, mod.source_code_before)
+                                writes.append((os.path.join(cartella, mod.filename), esito))
                     status = statusOK
                     toWrite = toWrite + status
                     file1.write(toWrite)
@@ -97,6 +161,14 @@ def startMiningRepo(data, cwd, repoName):
             toWrite = toWrite + status
             file1.write(toWrite)
             j+=1
+    writer.shutdown(wait=True)
+    #a failed write must not pass silently after the row was marked OK
+    for percorso, esito in writes:
+        try:
+            esito.result()
+        except Exception as errore:
+            print("WRITE FAILED: " + percorso)
+            file2.write("WRITE FAILED: " + percorso + " : " + str(errore) + "\n")
     file1.close()
     file2.close()
 def main():
@@ -1,3 +1,4 @@
+import mmap
 import os
 """
 This script takes the software metrics and the ASA dataset in order to create a unique dataset that contains both metrics
@@ -12,130 +13,85 @@ Then, for each line in software metrics dataset:
 -combines the two resulting metrics values
 -writes the combination line in the destination file
 """
+
+#the 19 "0" values used when a file has no line in the ASA dataset
+_ZERO_ASA = "0," * 19
+
+#deletes the possible " " and "\n" characters of an ASA line in a single pass
+_STRIP = str.maketrans("", "", " \n")
+
 def initialize(name_csv_sm, name_csv_asa, new_Union):
-	cwd = os.getcwd()
-	#Return to Union folder
-	os.chdir("..")
-	#Return to Dataset2
-	os.chdir("..")
-	os.chdir("Software_Metrics")
-	csv_sm = open(name_csv_sm, "r+",encoding="utf-8")
-	#Return to Dataset2
-	os.chdir("..")
-	os.chdir("mining_results_asa")
-	csv_asa = open(name_csv_asa, "r+",encoding="utf-8")
-	os.chdir("..")
-	#Return to Union_SM_ASA
-	os.chdir("Union/Union_SM_ASA")
+	#Absolute path of Dataset2, the two datasets are in its subfolders
+	base = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+	csv_sm = open(os.path.join(base, "Software_Metrics", name_csv_sm), "r+",encoding="utf-8", buffering=1<<20)
+	asa_header, asa_index = load_asa(os.path.join(base, "mining_results_asa", name_csv_asa))
 	number_of_file = 0
-	found = False
+	#collect the lines of the new dataset and write them all at the end
+	out_lines = []
 	flag_sm = True
-	flag_asa = True
 	for line_sm in csv_sm:
-		found=False
 		#If it's the first line of the csv software metrics
 		if(flag_sm == True):
 			flag_sm = False
-			line_asa = csv_asa.readline()
-			#If it's the first line of the csv ASA
-			if( flag_asa == True):
-				flag_asa = False
-					
-				withoutFirst2Argument = line_asa.split(',')
-				withoutFirst2Argument = withoutFirst2Argument[1:20]
-				toString = ""
-				for element in withoutFirst2Argument:
-					toString+= "," + element
-				withoutClassInMining = line_sm[:-7]
-				new_Union.write(withoutClassInMining + toString + ",class")
-				new_Union.write("\n")
-
-				
+			toString = "," + ",".join(asa_header)
+			withoutClassInMining = line_sm[:-7]
+			out_lines.append(withoutClassInMining + toString + ",class\n")
+
 		else:
-			csv_asa.seek(0,0)
-			csv_asa.readline()
-			file_name_sm = line_sm.split(',')[1].replace("\"","")
-
-			class_element = getClass(line_sm)
-			class_element = class_element.replace(" ","")
-			element_software_metrics = another_option(None, line_sm, class_element)
-			for line_asa in csv_asa:
-				file_name_asa = line_asa.split(',')[0].replace("\"", "")
-				if(file_name_sm == file_name_asa):
+			#split the SM line once: the file name, the class and the metrics all come from the same list
+			lista_sm = line_sm.rstrip("\n").split(",")
+			file_name_sm = lista_sm[1].replace("\"","")
+			class_element = lista_sm[-1].replace(" ","")
+			element_software_metrics = another_option(lista_sm, class_element)
+			matches = asa_index.get(file_name_sm)
+			if(matches == None): #if the script doesn't find the corresponding line in the ASA dataset
+				out_lines.append(element_software_metrics + _ZERO_ASA + class_element + "\n")
+			else:
+				#Static Analysis Results, already rendered at build time
+				for element_ASA in matches:
 					number_of_file += 1
-					#SOFTWARE METRICS
-					
-					#Static Analysis Results
-					element_ASA = another_option(line_asa, None, class_element)
-					found = True
-					#write the line of the new dataset
-					new_Union.write(element_software_metrics + element_ASA + class_element)	
-			if(found==False): #if the script doesn't find the corresponding line in the ASA dataset
-				element_ASA ="" # insert 19 "0" values
-				for i in range(0,19):
-					element_ASA +="0,"
-				new_Union.write(element_software_metrics +element_ASA + class_element)
+					#the line of the new dataset
+					out_lines.append(element_software_metrics + element_ASA + class_element + "\n")
+	new_Union.writelines(out_lines)
 	print("The files that are read and written are :" + str(number_of_file))
 	print("BUILD SUCCESS")
 
 
 '''
-@Param "line_asa" : line of the dataset ASA that contains all the values resulting by Static Analysis
-@Param "line_sm" : line of the software metrics dataset that contains all software metrics values
-@Param "class_element" : describe the class of the file [pos || neg]
+@Param "name_csv_asa" : path of the ASA dataset
 
-It's possible to call this function passing only one of the two parameter (passing None on the other parameter)
-IF WE PASS line_sm=None
-1. then it execute a split of the ASA elements in a list
-2. for each element of the resulting list, it deletes the possible "\n" characters and the count the elements
-3. skip the first two elements that are the type and the name of the file.
-4. It returns the concatenation of the element separated by ","
-
-If line_asa=None
-1. then it execute a split of the text mining elements in a list
-2. it deletes the class element
-3. for each element of the resulting list, it deletes the possible "\n" characters
-4. It returns the concatenation of the element separated by ","
+It reads the ASA dataset in a single pass and returns:
+-the list of the names of the ASA metrics (the header without the name of the file and the class)
+-a dict that maps each file name (<commit>/<filename.java>) to the rendered metrics of its lines
 '''
 
-def another_option(line_asa, line_sm, class_element):
-	if(line_sm == None):
-		toString = ""
-		class_element=class_element.replace(" ","")
-		class_element=class_element.replace("\n","")
-		lista = line_asa.replace(" ","").replace("\n","").split(",")
-
-		lista.remove(class_element)
-		count = 0
-		for element in lista:
-			elem = element.replace("\n", "")
-			if(count > 0):
-				toString += elem + ","
-			count += 1
-		return toString
-	elif(line_asa == None):
-		toString = ""
-		lista = line_sm.split(",")
-		lista.remove(class_element)
-		for element in lista:
-			elem = element.replace("\n", "")
-			toString += elem + ","
-		return toString
+def load_asa(name_csv_asa):
+	#map the file in memory and let the OS page it in, instead of copying it through the buffered reader
+	with open(name_csv_asa, "rb") as csv_asa, mmap.mmap(csv_asa.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+		asa_header = mm.readline().decode("utf-8").split(',')[1:20]
+		asa_index = {}
+		for line_asa in iter(mm.readline, b""):
+			lista = line_asa.decode("utf-8").translate(_STRIP).split(",")
+			file_name_asa = lista[0].replace("\"", "")
+			#render the ASA metrics once at build time: skip the name of the file and the class element
+			asa_index.setdefault(file_name_asa, []).append(",".join(lista[1:-1]) + ",")
+	return asa_header, asa_index
 
 '''
-@Param "line" : line of the dataset that contains class_element(pos || neg) 
-It returns the class element of the line
+@Param "lista_sm" : the fields of the software metrics line, already split on "," and cleaned of the "\n"
+@Param "class_element" : describe the class of the file [pos || neg]
+
+1. it deletes the class element from the list
+2. It returns the concatenation of the element separated by ","
 '''
-def getClass(line):
-	lista = line.split(",")
-	count = 0
-	for element in lista:
-		count+=1
-	return lista[count-1]
-	
+
+def another_option(lista_sm, class_element):
+	lista_sm.remove(class_element)
+	return ",".join(lista_sm) + ","
+
 
 def main():
-	new_Union = open("union_SM_ASA.csv", "w")
+	new_Union = open("union_SM_ASA.csv", "w", buffering=1<<20)
 	name_csv_sm = "mining_results_sm_final.csv"
 	name_csv_asa = "csv_ASA_final.csv"
 	initialize(name_csv_sm, name_csv_asa, new_Union)